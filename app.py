@@ -1,105 +1,367 @@
+import io
 import os
+import re
 import zipfile
-import json
 import base64
+from xml.sax.saxutils import escape
+import orjson
 import requests
-from flask import Flask, request, jsonify, render_template, send_file
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from werkzeug.exceptions import NotFound
+from flask import Flask, request, jsonify, render_template, send_file, send_from_directory
 from pptx import Presentation
 from pptx.util import Inches
 from pptx.enum.shapes import MSO_SHAPE
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 from pptx.enum.dml import MSO_THEME_COLOR
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.oxml.xmlchemy import OxmlElement
+from pptx.text.text import Font
 import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 
 # Configuration and setup
 app = Flask(__name__)
-UPLOAD_FOLDER = 'uploads'
 GENERATED_FOLDER = 'generated'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+LLM_CACHE_FOLDER = os.path.join(GENERATED_FOLDER, '.llmcache')
 os.makedirs(GENERATED_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+os.makedirs(LLM_CACHE_FOLDER, exist_ok=True)
 app.config['GENERATED_FOLDER'] = GENERATED_FOLDER
+# Let a front-end server (e.g. Apache mod_xsendfile) deliver generated files
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+
+# In-process LRU of parsed LLM responses, backed by LLM_CACHE_FOLDER on disk
+LLM_MEMORY_CACHE_SIZE = 256
+LLM_DISK_CACHE_SIZE = 2000
+_llm_memory_cache = OrderedDict()
+_llm_cache_lock = threading.Lock()
+
+# Shared HTTP session so LLM calls reuse pooled keep-alive TLS connections
+LLM_TIMEOUT = (5, 120)  # (connect, read) seconds
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    # Retry only connect failures and statuses where the provider did not run the
+    # completion; a read timeout or 504 means it may already be generating (and
+    # billing) it. Retry-After is ignored so a 429 can't sleep past the worker timeout.
+    max_retries=Retry(
+        total=3,
+        connect=3,
+        read=0,
+        status=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503],
+        allowed_methods=frozenset(['POST']),
+        respect_retry_after_header=False,
+    ),
+))
+
+# Long inputs are split into chunks (~4k tokens each) that are sent to the LLM concurrently
+MAX_CHUNK_CHARS = 16000
+LLM_MAX_PARALLEL_CALLS = 8
+
+# Prompt sent to every provider; only guidance and input_text vary per request
+SYSTEM_PROMPT = "You are a helpful assistant that generates presentation content in JSON format."
+INSTRUCTION_TEMPLATE = (
+    "You are a presentation content generator. Your task is to take a body of text and structure it "
+    "into a logical, multi-slide presentation. Each slide should have a title and a bulleted list of "
+    "key points. The content should be concise and easy to understand. "
+    "The user has provided the following guidance: '{guidance}'.\n\n"
+    "The output must be a JSON array of objects, where each object represents a slide. "
+    "Example format:\n"
+    "[{{"
+    "  \"title\": \"Slide Title\", "
+    "  \"points\": [\"Point 1\", \"Point 2\", \"Point 3\"]"
+    "}}, "
+    "{{"
+    "  \"title\": \"Another Slide\", "
+    "  \"points\": [\"Another point\"]"
+    "}}]\n\n"
+    "Now, please process the following text:\n\n---\n{input_text}\n---"
+)
+
+# Template media files treated as reusable images
+IMAGE_EXTENSIONS = ('.jpeg', '.jpg', '.png', '.gif', '.bmp')
+
+# Markdown code fence (```json ... ```) some models wrap their JSON in
+_CODE_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+# Code points that are not allowed in XML 1.0 text, including U+FFFE/U+FFFF
+# and lone surrogates (tab, newline and CR are allowed)
+_XML_INVALID_CHARS_RE = re.compile('[^\x09\x0a\x0d\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+# Line breaks inside a paragraph, written as <a:br/> like python-pptx does
+_LINE_BREAK_RE = re.compile('[\n\v]')
+
+# Number of generated presentations kept in GENERATED_FOLDER (least recently used are evicted)
+MAX_GENERATED_FILES = 200
+# Age after which a leftover *.tmp file in a cache folder is considered abandoned
+STALE_TMP_SECONDS = 600
 
 def get_slide_layout_by_name(prs, name):
-    for layout in prs.slide_layouts:
-        if layout.name == name:
-            return layout
-    return prs.slide_layouts[0] # Fallback to first layout
+    # Name -> layout index, built on first lookup and kept on the presentation
+    layout_by_name = getattr(prs, '_layout_by_name', None)
+    if layout_by_name is None:
+        layout_by_name = {}
+        for layout in prs.slide_layouts:
+            layout_by_name.setdefault(layout.name, layout)  # first match wins
+        prs._layout_by_name = layout_by_name
+    layout = layout_by_name.get(name)
+    if layout is None:
+        return prs.slide_layouts[0] # Fallback to first layout
+    return layout
+
+def apply_default_text_style(prs, font_name, color):
+    """
+    Sets the default font and color in the slide masters' text styles and the
+    presentation's default text style, so new runs inherit them.
+    """
+    styles = list(prs.part._element.iterchildren(qn('p:defaultTextStyle')))
+    for master in prs.slide_masters:
+        txStyles = master.element.find(qn('p:txStyles'))
+        if txStyles is not None:
+            styles.extend(txStyles.iterchildren(qn('p:titleStyle'), qn('p:bodyStyle'), qn('p:otherStyle')))
 
-def extract_images_from_template(pptx_path, temp_dir):
+    for style in styles:
+        # a:defPPr and a:lvl1pPr .. a:lvl9pPr
+        for pPr in style:
+            if not isinstance(pPr.tag, str) or not pPr.tag.endswith('pPr'):
+                continue
+            defRPr = pPr.find(qn('a:defRPr'))
+            if defRPr is None:
+                defRPr = OxmlElement('a:defRPr')
+                extLst = pPr.find(qn('a:extLst'))
+                if extLst is not None:
+                    extLst.addprevious(defRPr)
+                else:
+                    pPr.append(defRPr)
+            font = Font(defRPr)
+            if font_name:
+                font.name = font_name
+            if color:
+                font.color.rgb = color
+
+def extract_images_from_template(pptx_file, temp_dir):
+    """pptx_file may be a path or a file-like object such as io.BytesIO."""
     image_paths = []
     try:
-        with zipfile.ZipFile(pptx_path, 'r') as zip_ref:
-            for file_name in zip_ref.namelist():
-                if file_name.startswith('ppt/media/') and (file_name.endswith('.jpeg') or file_name.endswith('.png')):
-                    zip_ref.extract(file_name, temp_dir)
-                    image_paths.append(os.path.join(temp_dir, file_name))
+        with zipfile.ZipFile(pptx_file, 'r') as zip_ref:
+            names = [n for n in zip_ref.namelist()
+                     if n.startswith('ppt/media/') and n.lower().endswith(IMAGE_EXTENSIONS)]
+            zip_ref.extractall(temp_dir, members=names)
+            image_paths = [os.path.join(temp_dir, n) for n in names]
     except zipfile.BadZipFile:
         print("Not a valid PowerPoint file.")
     return image_paths
 
-def generate_presentation_content(input_text, api_key, guidance, provider):
+def request_identity(input_text, guidance, provider):
+    """Fields that identify an LLM result; shared by the LLM and output cache keys."""
+    adapter = PROVIDERS.get(provider)
+    model = adapter.model if adapter else ''
+    return [provider, model, guidance, input_text]
+
+def llm_cache_key(input_text, guidance, provider):
+    """Hash everything that determines the LLM output (the API key does not)."""
+    # orjson.dumps of a list keeps the field boundaries unambiguous
+    return hashlib.blake2b(orjson.dumps(request_identity(input_text, guidance, provider)),
+                           digest_size=32).hexdigest()
+
+def is_renderable_slides(slides):
+    """True if slides is a non-empty list that is not just an error object."""
+    if not isinstance(slides, list) or not slides:
+        return False
+    return not (len(slides) == 1 and isinstance(slides[0], dict) and 'error' in slides[0])
+
+def load_cached_slides(key):
+    """Returns cached slide data for key, or None on a miss."""
+    with _llm_cache_lock:
+        if key in _llm_memory_cache:
+            _llm_memory_cache.move_to_end(key)
+            return _llm_memory_cache[key]
+
+    cache_path = os.path.join(LLM_CACHE_FOLDER, key + '.json')
+    try:
+        with open(cache_path, 'rb') as f:
+            slides = orjson.loads(f.read())
+        os.utime(cache_path)  # mark as recently used for eviction
+    except (OSError, ValueError):
+        return None
+    if not is_renderable_slides(slides):
+        return None
+
+    remember_slides(key, slides)
+    return slides
+
+def remember_slides(key, slides):
+    with _llm_cache_lock:
+        _llm_memory_cache[key] = slides
+        _llm_memory_cache.move_to_end(key)
+        while len(_llm_memory_cache) > LLM_MEMORY_CACHE_SIZE:
+            _llm_memory_cache.popitem(last=False)
+
+def store_cached_slides(key, slides):
+    """Writes slide data to the memory and disk caches; the disk write is atomic."""
+    remember_slides(key, slides)
+    cache_path = os.path.join(LLM_CACHE_FOLDER, key + '.json')
+    try:
+        write_file_atomic(cache_path, orjson.dumps(slides))
+    except OSError as e:
+        print(f"Could not write LLM cache entry: {e}")
+        return
+    # Cache maintenance must never fail a request whose LLM call succeeded
+    try:
+        evict_lru_files(LLM_CACHE_FOLDER, '.json', LLM_DISK_CACHE_SIZE)
+    except Exception as e:
+        print(f"Could not evict LLM cache entries: {e}")
+
+def write_file_atomic(path, data):
+    """Writes data to a temp file next to path and renames it into place."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        # Only left behind if the write or rename failed
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def evict_generated_files(max_files=MAX_GENERATED_FILES):
+    """Deletes the least recently used generated presentations beyond max_files."""
+    evict_lru_files(app.config['GENERATED_FOLDER'], '.pptx', max_files)
+
+def evict_lru_files(folder, suffix, max_files):
     """
-    Calls the LLM API to generate presentation content.
-    Returns a dictionary of slide data.
+    Deletes the least recently used (oldest mtime) files ending in suffix beyond
+    max_files, plus temp files abandoned by a worker killed mid-write.
     """
-    provider_endpoints = {
-        'openai': 'https://api.openai.com/v1/chat/completions',
-        'anthropic': 'https://api.anthropic.com/v1/messages',
-        'gemini': 'https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent',
-    }
-    
-    # Common instruction for all LLMs
-    instruction = (
-        f"You are a presentation content generator. Your task is to take a body of text and structure it "
-        f"into a logical, multi-slide presentation. Each slide should have a title and a bulleted list of "
-        f"key points. The content should be concise and easy to understand. "
-        f"The user has provided the following guidance: '{guidance}'.\n\n"
-        f"The output must be a JSON array of objects, where each object represents a slide. "
-        f"Example format:\n"
-        f"[{{"
-        f"  \"title\": \"Slide Title\", "
-        f"  \"points\": [\"Point 1\", \"Point 2\", \"Point 3\"]"
-        f"}}, "
-        f"{{"
-        f"  \"title\": \"Another Slide\", "
-        f"  \"points\": [\"Another point\"]"
-        f"}}]\n\n"
-        f"Now, please process the following text:\n\n---\n{input_text}\n---"
-    )
-
-    headers = {}
-    payload = {}
-    
-    if provider == 'openai':
-        headers['Authorization'] = f'Bearer {api_key}'
-        payload = {
-            "model": "gpt-4o-mini",
+    try:
+        files = [e for e in os.scandir(folder) if e.is_file()]
+    except OSError:
+        return
+
+    stale_before = time.time() - STALE_TMP_SECONDS
+    for entry in files:
+        if entry.name.endswith('.tmp'):
+            try:
+                if entry.stat().st_mtime < stale_before:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    # Other workers may delete files concurrently; skip entries that have vanished
+    entries = []
+    for entry in files:
+        if entry.name.endswith(suffix):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                pass
+    if len(entries) <= max_files:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def split_text_into_chunks(text, max_chars=MAX_CHUNK_CHARS):
+    """Splits text on paragraph boundaries into chunks of at most max_chars."""
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    current = ""
+    for paragraph in text.split("\n\n"):
+        # Hard-split paragraphs that are too long on their own
+        while len(paragraph) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+class OpenAIAdapter:
+    __slots__ = ()
+    model = 'gpt-4o-mini'
+
+    def endpoint(self, api_key):
+        return 'https://api.openai.com/v1/chat/completions'
+
+    def headers(self, api_key):
+        return {
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        }
+
+    def build_payload(self, instruction):
+        return {
+            "model": self.model,
             "messages": [
-                {"role": "system", "content": "You are a helpful assistant that generates presentation content in JSON format."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": instruction}
             ]
         }
-    elif provider == 'anthropic':
-        headers = {
+
+    def extract_json(self, content):
+        return content['choices'][0]['message']['content']
+
+class AnthropicAdapter:
+    __slots__ = ()
+    model = 'claude-3-haiku-20240307'
+
+    def endpoint(self, api_key):
+        return 'https://api.anthropic.com/v1/messages'
+
+    def headers(self, api_key):
+        return {
             'x-api-key': api_key,
             'anthropic-version': '2023-06-01',
             'content-type': 'application/json'
         }
-        payload = {
-            "model": "claude-3-haiku-20240307",
-            "system": "You are a helpful assistant that generates presentation content in JSON format.",
+
+    def build_payload(self, instruction):
+        return {
+            "model": self.model,
+            "system": SYSTEM_PROMPT,
             "messages": [
                 {"role": "user", "content": instruction}
             ]
         }
-    elif provider == 'gemini':
-        headers = {
+
+    def extract_json(self, content):
+        return content['content'][0]['text']
+
+class GeminiAdapter:
+    __slots__ = ()
+    model = 'gemini-1.5-flash'
+
+    def endpoint(self, api_key):
+        return f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent?key={api_key}"
+
+    def headers(self, api_key):
+        return {
             'Content-Type': 'application/json',
         }
-        url = f"{provider_endpoints[provider]}?key={api_key}"
-        payload = {
+
+    def build_payload(self, instruction):
+        return {
             "contents": [
                 {
                     "role": "user",
@@ -109,41 +371,159 @@ def generate_presentation_content(input_text, api_key, guidance, provider):
                 }
             ]
         }
-    else:
+
+    def extract_json(self, content):
+        return content['candidates'][0]['content']['parts'][0]['text']
+
+# Supported LLM providers; the model of each is also part of the LLM cache key
+PROVIDERS = {
+    'openai': OpenAIAdapter(),
+    'anthropic': AnthropicAdapter(),
+    'gemini': GeminiAdapter(),
+}
+
+def request_slides(input_text, api_key, guidance, provider):
+    """
+    Makes a single LLM API call for input_text and returns the parsed JSON.
+    Raises on HTTP or parsing errors.
+    """
+    adapter = PROVIDERS[provider]
+    instruction = INSTRUCTION_TEMPLATE.format(guidance=guidance, input_text=input_text)
+    payload = adapter.build_payload(instruction)
+
+    response = _SESSION.post(adapter.endpoint(api_key), headers=adapter.headers(api_key),
+                             data=orjson.dumps(payload), timeout=LLM_TIMEOUT)
+    response.raise_for_status()
+    
+    json_str = adapter.extract_json(orjson.loads(response.content))
+
+    # Clean up markdown code blocks if present
+    json_str = _CODE_FENCE_RE.sub('', json_str)
+
+    return orjson.loads(json_str)
+
+def persist_generated_file(output_path, data):
+    """Writes a generated presentation to the output cache atomically, then evicts old ones."""
+    try:
+        write_file_atomic(output_path, data)
+    except OSError as e:
+        print(f"Could not write generated presentation: {e}")
+        return
+    # Runs on a background thread; log rather than let an eviction error kill it
+    try:
+        evict_generated_files()
+    except Exception as e:
+        print(f"Could not evict generated presentations: {e}")
+
+def send_generated_file(filename):
+    """
+    Sends a generated presentation, refusing paths outside GENERATED_FOLDER and
+    handing delivery to the front-end server when USE_X_SENDFILE is set.
+    """
+    return send_from_directory(app.config['GENERATED_FOLDER'], filename, as_attachment=True,
+                               download_name='presentation.pptx')
+
+def generate_presentation_content(input_text, api_key, guidance, provider):
+    """
+    Calls the LLM API to generate presentation content.
+    Returns a dictionary of slide data.
+    Identical requests are answered from the LLM cache without an API call.
+    Long inputs are split into chunks that are sent to the LLM in parallel.
+    """
+    cache_key = llm_cache_key(input_text, guidance, provider)
+    cached = load_cached_slides(cache_key)
+    if cached is not None:
+        return cached
+
+    if provider not in PROVIDERS:
         return {'error': 'Unsupported LLM provider.'}, 400
 
     try:
-        if provider == 'gemini':
-            response = requests.post(url, headers=headers, json=payload)
+        chunks = split_text_into_chunks(input_text)
+        if len(chunks) == 1:
+            results = [request_slides(chunks[0], api_key, guidance, provider)]
         else:
-            response = requests.post(provider_endpoints[provider], headers=headers, json=payload)
-        response.raise_for_status()
-        
-        content = response.json()
-        
-        if provider == 'openai':
-            json_str = content['choices'][0]['message']['content']
-        elif provider == 'anthropic':
-            json_str = content['content'][0]['text']
-        elif provider == 'gemini':
-            json_str = content['candidates'][0]['content']['parts'][0]['text']
-
-        # Clean up markdown code blocks if present
-        if json_str.startswith("```json"):
-            json_str = json_str.strip("```json\n").strip()
-            
-        print("LLM JSON response:", json_str) # Log for debugging
-        return json.loads(json_str)
+            workers = min(len(chunks), LLM_MAX_PARALLEL_CALLS)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    lambda chunk: request_slides(chunk, api_key, guidance, provider), chunks))
+
+        # Concatenate the slide arrays of all chunks in order
+        slides = []
+        for result in results:
+            if isinstance(result, list):
+                slides.extend(result)
+            else:
+                slides.append(result)
+
+        # Don't cache (or render) empty or error-only results; a retry should ask again
+        if not is_renderable_slides(slides):
+            return {'error': 'LLM returned no usable slides.'}, 500
+
+        store_cached_slides(cache_key, slides)
+        return slides
         
     except requests.exceptions.RequestException as e:
         print(f"API call failed: {e}")
         return {'error': f"LLM API call failed: {e}"}, 500
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         return {'error': 'LLM returned malformed JSON.'}, 500
     except Exception as e:
         print(f"An error occurred: {e}")
         return {'error': f"An error occurred: {e}"}, 500
     
+def set_paragraphs(text_frame, lines):
+    """
+    Replaces the paragraphs of text_frame with one paragraph per line. All
+    paragraphs are built as a single XML fragment and parsed in one go.
+    """
+    paragraphs = []
+    for line in lines:
+        parts = _LINE_BREAK_RE.split(str(line))
+        runs = '<a:br/>'.join(f'<a:r><a:t>{escape(_XML_INVALID_CHARS_RE.sub(" ", part))}</a:t></a:r>'
+                              for part in parts)
+        paragraphs.append(f'<a:p>{runs}</a:p>')
+    fragment = parse_xml(f'<p:txBody {nsdecls("a", "p")}>{"".join(paragraphs)}</p:txBody>')
+
+    txBody = text_frame._txBody
+    for p in txBody.findall(qn('a:p')):
+        txBody.remove(p)
+    txBody.extend(list(fragment))
+
+def content_layout_plan(layout):
+    """
+    Inspects layout once per deck and returns (has_title, has_body): whether
+    slides added from it get a title placeholder (idx 0) and a body
+    placeholder (idx 1), so add_content_slide doesn't probe every slide.
+    """
+    idxs = {ph.placeholder_format.idx for ph in layout.iter_cloneable_placeholders()}
+    return 0 in idxs, 1 in idxs
+
+def add_content_slide(prs, layout, slide, index, plan):
+    """Adds one title + bullet points slide built from a normalized slide dict."""
+    has_title, has_body = plan
+    new_slide = prs.slides.add_slide(layout)
+    
+    # Title
+    slide_title = slide.get("title", f"Slide {index+1}")
+    if has_title:
+        new_slide.shapes.title.text = slide_title
+    else:
+        textbox = new_slide.shapes.add_textbox(Inches(1), Inches(0.5), Inches(8), Inches(1))
+        textbox.text_frame.text = slide_title
+    
+    # Bullet points
+    if slide.get("points"):
+        if has_body:
+            set_paragraphs(new_slide.placeholders[1].text_frame, slide["points"])
+        else:
+            # fallback: add textbox manually
+            left, top, width, height = Inches(1), Inches(1.5), Inches(8), Inches(4)
+            textbox = new_slide.shapes.add_textbox(left, top, width, height)
+            set_paragraphs(textbox.text_frame, slide["points"])
+
+    return new_slide
+
 def normalize_slide_data(raw):
     """Ensure slide data is always a list of dicts with 'title' and 'points'."""
     slides = []
@@ -186,14 +566,27 @@ def generate_pptx():
         if not all([api_key, text_content, template_file]):
             return jsonify({'error': 'Missing required fields.'}), 400
 
-        # Save template file
-        template_path = os.path.join(app.config['UPLOAD_FOLDER'], template_file.filename)
-        template_file.save(template_path)
+        # Keep the template in memory; it is only ever read back by python-pptx
+        template_bytes = template_file.read()
+
+        # Serve a previous render of the same content + template directly
+        tpl_hash = hashlib.blake2b(template_bytes, digest_size=8).hexdigest()
+        content_hash = hashlib.blake2b(orjson.dumps(request_identity(text_content, guidance, llm_provider)),
+                                       digest_size=8).hexdigest()
+        output_filename = f"generated_{content_hash}_{tpl_hash}.pptx"
+        output_path = os.path.join(app.config['GENERATED_FOLDER'], output_filename)
+        try:
+            os.utime(output_path)  # mark as recently used for eviction
+            return send_generated_file(output_filename)
+        except (FileNotFoundError, NotFound):
+            pass  # not cached (or evicted meanwhile): build it below
         
         # Call LLM to get content
         slide_data = generate_presentation_content(text_content, api_key, guidance, llm_provider)
-        if 'error' in slide_data:
-            return jsonify(slide_data), slide_data.get('code', 500)
+        if isinstance(slide_data, tuple):
+            # Error result: (body, status); nothing is built or cached
+            body, status = slide_data
+            return jsonify(body), status
 
         # 🔧 Normalize the data to avoid 'int' or malformed structures
         slide_data = normalize_slide_data(slide_data)
@@ -201,7 +594,7 @@ def generate_pptx():
 
         # Load template presentation
         try:
-            prs = Presentation(template_path)
+            prs = Presentation(io.BytesIO(template_bytes))
         except Exception as e:
             return jsonify({'error': f'Failed to load PowerPoint template: {e}'}), 500
         
@@ -211,13 +604,14 @@ def generate_pptx():
         
         # Fallback font and color
         template_font = "Calibri"
-        from pptx.dml.color import RGBColor
         template_color = RGBColor(0, 0, 0)  # black
+        apply_default_text_style(prs, template_font, template_color)
 
-        # Remove existing slides
-        for i in range(len(prs.slides) - 1, -1, -1):
-            s = prs.slides._sldIdLst[i]
-            prs.slides._sldIdLst.remove(s)
+        # Remove existing slides (drop their relationships so the parts aren't saved)
+        sldIdLst = prs.slides._sldIdLst
+        for sldId in sldIdLst:
+            prs.part.drop_rel(sldId.rId)
+        sldIdLst.clear()
             
         # --- Title slide ---
         if title_slide_layout:
@@ -243,54 +637,18 @@ def generate_pptx():
                     pass  # skip if subtitle placeholder invalid
 
         # --- Other slides ---
+        layout = content_slide_layout or prs.slide_layouts[0]
+        plan = content_layout_plan(layout)
         for i, slide in enumerate(slide_data[1:], start=1):
-            layout = content_slide_layout or prs.slide_layouts[0]
-            new_slide = prs.slides.add_slide(layout)
-            
-            # Title
-            slide_title = slide.get("title", f"Slide {i+1}")
-            title_shape = new_slide.shapes.title
-            if title_shape:
-                title_shape.text = slide_title
-            else:
-                textbox = new_slide.shapes.add_textbox(Inches(1), Inches(0.5), Inches(8), Inches(1))
-                textbox.text_frame.text = slide_title
-            
-            # Bullet points
-            if slide.get("points"):
-                try:
-                    body_shape = new_slide.placeholders[1]
-                    tf = body_shape.text_frame
-                    tf.clear()
-                    for point in slide["points"]:
-                        p = tf.add_paragraph()
-                        p.text = point
-                        p.level = 0
-                except Exception:
-                    # fallback: add textbox manually
-                    left, top, width, height = Inches(1), Inches(1.5), Inches(8), Inches(4)
-                    textbox = new_slide.shapes.add_textbox(left, top, width, height)
-                    tf = textbox.text_frame
-                    for point in slide["points"]:
-                        p = tf.add_paragraph()
-                        p.text = point
-
-            # Apply font/color styling (fallbacks)
-            for shape in new_slide.shapes:
-                if shape.has_text_frame:
-                    for paragraph in shape.text_frame.paragraphs:
-                        for run in paragraph.runs:
-                            if template_font:
-                                run.font.name = template_font
-                            if template_color:
-                                run.font.color.rgb = template_color
-
-        # Save final PPTX
-        output_filename = f"generated_{hashlib.md5(text_content.encode()).hexdigest()}.pptx"
-        output_path = os.path.join(app.config['GENERATED_FOLDER'], output_filename)
-        prs.save(output_path)
+            add_content_slide(prs, layout, slide, i, plan)
+
+        # Save final PPTX in memory, respond with it and fill the output cache in the background
+        buf = io.BytesIO()
+        prs.save(buf)
+        threading.Thread(target=persist_generated_file, args=(output_path, buf.getvalue()), daemon=True).start()
+        buf.seek(0)
         
-        return send_file(output_path, as_attachment=True, download_name='presentation.pptx')
+        return send_file(buf, as_attachment=True, download_name='presentation.pptx')
         
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
@@ -300,5 +658,12 @@ def generate_pptx():
 def index():
     return render_template('index.html')
 
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Development server only (set FLASK_DEBUG=1 for the debugger/reloader).
+    # In production run a multi-worker WSGI server, e.g.:
+    #   gunicorn -k gthread -w 4 --threads 16 -t 180 app:app
+    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file